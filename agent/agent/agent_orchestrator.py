@@ -4,9 +4,11 @@ Coordinates specialized agents and manages agent-to-agent communication.
 """
 
 from typing import Dict, List, Any, Optional
+from collections import deque
 from datetime import datetime
 import json
 import asyncio
+import re
 from dataclasses import dataclass
 
 from .inventory_agent import InventoryAgent
@@ -14,9 +16,24 @@ from .forecasting_agent import ForecastingAgent
 from .supplier_agent import SupplierAgent
 from .memory_manager import AgentMemoryManager
 
+def _keyword_pattern(keywords: List[str]):
+    """Compile keywords into one alternation so a single scan finds any of them."""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+# Intent keyword sets (matched as substrings of the lowercased request)
+INVENTORY_KEYWORDS = _keyword_pattern(["inventory", "stock", "reorder", "low stock", "out of stock"])
+FORECASTING_KEYWORDS = _keyword_pattern(["forecast", "predict", "demand", "trend", "seasonal"])
+SUPPLIER_KEYWORDS = _keyword_pattern(["supplier", "vendor", "procurement", "cost", "performance"])
+COMPLEX_KEYWORDS = _keyword_pattern(["optimize", "analyze", "comprehensive", "supply chain", "strategy"])
+
+# Collaboration messages kept in the orchestrator's queue; the oldest are dropped beyond this
+MESSAGE_QUEUE_MAXLEN = 4096
+
 @dataclass
 class AgentMessage:
     """Message structure for agent-to-agent communication."""
+    # Declared by hand: dataclass(slots=True) needs Python 3.10+
+    __slots__ = ("sender", "recipient", "message_type", "data", "timestamp", "request_id")
     sender: str
     recipient: str
     message_type: str
@@ -37,8 +54,15 @@ class AgentOrchestrator:
             "forecasting_agent": ForecastingAgent(memory_manager=self.memory_manager),
             "supplier_agent": SupplierAgent(memory_manager=self.memory_manager)
         }
-        self.message_queue = []
+        self.message_queue = deque(maxlen=MESSAGE_QUEUE_MAXLEN)
         self.conversation_context = {}
+        
+        # Primary agent -> request handler (anything else is handled as a complex request)
+        self._intent_handlers = {
+            "inventory_agent": self._handle_inventory_request,
+            "forecasting_agent": self._handle_forecasting_request,
+            "supplier_agent": self._handle_supplier_request
+        }
     
     async def process_user_request(self, user_input: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Process user request and coordinate appropriate agents."""
@@ -51,14 +75,8 @@ class AgentOrchestrator:
         intent = self._analyze_intent(user_input)
         
         # Route to appropriate agents
-        if intent["primary_agent"] == "inventory_agent":
-            return await self._handle_inventory_request(user_input, context, intent)
-        elif intent["primary_agent"] == "forecasting_agent":
-            return await self._handle_forecasting_request(user_input, context, intent)
-        elif intent["primary_agent"] == "supplier_agent":
-            return await self._handle_supplier_request(user_input, context, intent)
-        else:
-            return await self._handle_complex_request(user_input, context, intent)
+        handler = self._intent_handlers.get(intent["primary_agent"], self._handle_complex_request)
+        return await handler(user_input, context, intent)
     
     async def _handle_inventory_request(self, user_input: str, context: Dict[str, Any], intent: Dict) -> Dict[str, Any]:
         """Handle inventory-related requests with potential agent collaboration."""
@@ -212,27 +230,23 @@ class AgentOrchestrator:
         }
         
         # Inventory-related keywords
-        inventory_keywords = ["inventory", "stock", "reorder", "low stock", "out of stock"]
-        if any(keyword in user_lower for keyword in inventory_keywords):
+        if INVENTORY_KEYWORDS.search(user_lower):
             intent["primary_agent"] = "inventory_agent"
             intent["needs_forecasting"] = "forecast" in user_lower or "predict" in user_lower
             intent["needs_supplier_recommendations"] = "supplier" in user_lower or "recommend" in user_lower
         
         # Forecasting-related keywords
-        forecasting_keywords = ["forecast", "predict", "demand", "trend", "seasonal"]
-        elif any(keyword in user_lower for keyword in forecasting_keywords):
+        elif FORECASTING_KEYWORDS.search(user_lower):
             intent["primary_agent"] = "forecasting_agent"
             intent["needs_inventory_integration"] = "inventory" in user_lower or "stock" in user_lower
         
         # Supplier-related keywords
-        supplier_keywords = ["supplier", "vendor", "procurement", "cost", "performance"]
-        elif any(keyword in user_lower for keyword in supplier_keywords):
+        elif SUPPLIER_KEYWORDS.search(user_lower):
             intent["primary_agent"] = "supplier_agent"
             intent["needs_logistics_optimization"] = "shipping" in user_lower or "logistics" in user_lower
         
         # Complex requests
-        complex_keywords = ["optimize", "analyze", "comprehensive", "supply chain", "strategy"]
-        if any(keyword in user_lower for keyword in complex_keywords):
+        if COMPLEX_KEYWORDS.search(user_lower):
             intent["complex_request"] = True
             intent["primary_agent"] = "orchestrator"
         
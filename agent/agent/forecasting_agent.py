@@ -4,10 +4,18 @@ Specialized agent for demand prediction, trend analysis, and forecasting models.
 """
 
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
-import json
+import bisect
 import statistics
 
+from .request_ids import next_request_id
+
+# Trend labels ordered by the number of thresholds (0.9x, 1.1x) the recent average crosses
+_TREND_LABELS = ("decreasing", "stable", "increasing")
+
+# Anomaly severity by z-score: above 3 is high, otherwise medium
+ANOMALY_SEVERITY_THRESHOLDS = (3,)
+ANOMALY_SEVERITY_LABELS = ("medium", "high")
+
 class ForecastingAgent:
     """Specialized agent for demand forecasting and trend analysis."""
     
@@ -80,18 +88,21 @@ class ForecastingAgent:
             mean_demand = statistics.mean(demand_history)
             std_demand = statistics.stdev(demand_history) if len(demand_history) > 1 else 0
             
+            item_id = item.get('id')
+            item_name = item.get('name')
+            
             for i, demand in enumerate(demand_history):
                 z_score = abs((demand - mean_demand) / std_demand) if std_demand > 0 else 0
                 
                 if z_score > 2:  # 2 standard deviations
                     anomalies.append({
-                        "item_id": item.get('id'),
-                        "item_name": item.get('name'),
+                        "item_id": item_id,
+                        "item_name": item_name,
                         "period": i,
                         "actual_demand": demand,
                         "expected_demand": mean_demand,
                         "z_score": z_score,
-                        "severity": "high" if z_score > 3 else "medium"
+                        "severity": ANOMALY_SEVERITY_LABELS[bisect.bisect_left(ANOMALY_SEVERITY_THRESHOLDS, z_score)]
                     })
         
         return {"anomalies": anomalies}
@@ -233,12 +244,8 @@ class ForecastingAgent:
         recent_avg = sum(data[-3:]) / 3
         earlier_avg = sum(data[:3]) / 3
         
-        if recent_avg > earlier_avg * 1.1:
-            return "increasing"
-        elif recent_avg < earlier_avg * 0.9:
-            return "decreasing"
-        else:
-            return "stable"
+        # Each threshold crossed moves one step up the label table
+        return _TREND_LABELS[(recent_avg >= earlier_avg * 0.9) + (recent_avg > earlier_avg * 1.1)]
     
     def _detect_seasonality(self, data: List[float]) -> bool:
         """Detect if data has seasonal patterns."""
@@ -309,5 +316,5 @@ class ForecastingAgent:
             "request_type": "update_forecast_data",
             "target_agent": "inventory_agent",
             "data": forecast_data,
-            "request_id": f"forecasting_{datetime.now().isoformat()}"
+            "request_id": next_request_id(self.agent_id)
         }
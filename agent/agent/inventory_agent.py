@@ -4,8 +4,14 @@ Specialized agent for inventory optimization, stock management, and reorder poin
 """
 
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
-import json
+import bisect
+import time
+
+from .request_ids import next_request_id
+
+# Stockout risk by days of cover: < 3 critical, < 7 high, < 14 medium, otherwise low
+STOCKOUT_RISK_THRESHOLDS = (3, 7, 14)
+STOCKOUT_RISK_LABELS = ("critical", "high", "medium", "low")
 
 class InventoryAgent:
     """Specialized agent for inventory management and optimization."""
@@ -21,22 +27,27 @@ class InventoryAgent:
             "inventory_turnover_analysis",
             "stockout_prediction"
         ]
+        # Short-lived cache of _get_historical_context() to avoid repeated memory searches
+        self._ctx_cache = None
+        self._ctx_ts = 0.0
+        self._ctx_ttl = 5.0  # seconds
     
     def analyze_stock_levels(self, inventory_data: List[Dict]) -> Dict[str, Any]:
         """Analyze current stock levels and identify issues."""
         # Get historical context from memory
         historical_context = self._get_historical_context()
         
-        analysis = {
-            "low_stock_items": [],
-            "out_of_stock_items": [],
-            "overstocked_items": [],
-            "critical_items": [],
-            "recommendations": [],
-            "historical_insights": historical_context
-        }
+        low_stock_items = []
+        out_of_stock_items = []
+        overstocked_items = []
+        add_low_stock = low_stock_items.append
+        add_out_of_stock = out_of_stock_items.append
+        add_overstocked = overstocked_items.append
         
+        # Single sweep: each field is read once per item and shared by every bucket test
         for item in inventory_data:
+            item_id = item.get('id')
+            name = item.get('name')
             current_stock = item.get('current_stock', 0)
             min_stock = item.get('min_stock', 0)
             max_stock = item.get('max_stock', 0)
@@ -44,9 +55,9 @@ class InventoryAgent:
             
             # Low stock analysis
             if current_stock <= reorder_point:
-                analysis["low_stock_items"].append({
-                    "item_id": item.get('id'),
-                    "name": item.get('name'),
+                add_low_stock({
+                    "item_id": item_id,
+                    "name": name,
                     "current_stock": current_stock,
                     "reorder_point": reorder_point,
                     "urgency": "high" if current_stock <= min_stock else "medium"
@@ -54,22 +65,31 @@ class InventoryAgent:
             
             # Out of stock
             if current_stock == 0:
-                analysis["out_of_stock_items"].append({
-                    "item_id": item.get('id'),
-                    "name": item.get('name'),
+                add_out_of_stock({
+                    "item_id": item_id,
+                    "name": name,
                     "impact": "critical"
                 })
             
             # Overstocked items
             if current_stock > max_stock * 1.2:  # 20% over max
-                analysis["overstocked_items"].append({
-                    "item_id": item.get('id'),
-                    "name": item.get('name'),
+                add_overstocked({
+                    "item_id": item_id,
+                    "name": name,
                     "current_stock": current_stock,
                     "max_stock": max_stock,
                     "excess": current_stock - max_stock
                 })
         
+        analysis = {
+            "low_stock_items": low_stock_items,
+            "out_of_stock_items": out_of_stock_items,
+            "overstocked_items": overstocked_items,
+            "critical_items": [],
+            "recommendations": [],
+            "historical_insights": historical_context
+        }
+        
         return analysis
     
     def calculate_reorder_points(self, inventory_data: List[Dict], demand_forecast: Dict = None) -> Dict[str, Any]:
@@ -117,9 +137,9 @@ class InventoryAgent:
                     "name": item.get('name'),
                     "current_stock": current_stock,
                     "days_until_stockout": round(days_until_stockout, 1),
-                    "risk_level": "critical" if days_until_stockout < 3 else 
-                               "high" if days_until_stockout < 7 else 
-                               "medium" if days_until_stockout < 14 else "low"
+                    "risk_level": STOCKOUT_RISK_LABELS[
+                        bisect.bisect_right(STOCKOUT_RISK_THRESHOLDS, days_until_stockout)
+                    ]
                 })
         
         return {"stockout_predictions": predictions}
@@ -181,7 +201,7 @@ class InventoryAgent:
             "request_type": "demand_forecast",
             "target_agent": "forecasting_agent",
             "data": inventory_data,
-            "request_id": f"inventory_{datetime.now().isoformat()}"
+            "request_id": next_request_id(self.agent_id)
         }
     
     def collaborate_with_supplier_agent(self, low_stock_items: List[Dict]) -> Dict[str, Any]:
@@ -197,14 +217,23 @@ class InventoryAgent:
             "request_type": "supplier_recommendations",
             "target_agent": "supplier_agent", 
             "data": low_stock_items,
-            "request_id": f"inventory_{datetime.now().isoformat()}"
+            "request_id": next_request_id(self.agent_id)
         }
     
+    def refresh_context(self) -> None:
+        """Invalidate the cached historical context so the next analysis re-queries memory."""
+        self._ctx_cache = None
+        self._ctx_ts = 0.0
+    
     def _get_historical_context(self) -> Dict[str, Any]:
         """Get historical context from memory."""
         if not self.memory_manager:
             return {}
         
+        now = time.monotonic()
+        if self._ctx_cache is not None and now - self._ctx_ts < self._ctx_ttl:
+            return self._ctx_cache
+        
         # Get recent inventory analysis patterns
         recent_analyses = self.memory_manager.retrieve_agent_memory(
             self.agent_id, "inventory analysis stock levels patterns", limit=5
@@ -213,10 +242,12 @@ class InventoryAgent:
         # Get learning insights
         learning_insights = self.memory_manager.get_agent_learning_history(self.agent_id)
         
-        return {
+        self._ctx_cache = {
             "recent_patterns": recent_analyses,
             "learning_insights": learning_insights
         }
+        self._ctx_ts = now
+        return self._ctx_cache
     
     def store_analysis_results(self, analysis_results: Dict[str, Any], 
                               recommendations: List[str] = None) -> str:
@@ -224,6 +255,7 @@ class InventoryAgent:
         if not self.memory_manager:
             return "Memory manager not available"
         
+        self.refresh_context()
         return self.memory_manager.store_analysis_results(
             self.agent_id, "inventory_analysis", analysis_results, recommendations
         )
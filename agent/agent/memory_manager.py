@@ -4,54 +4,243 @@ LlamaIndex-based persistent memory for specialized agents.
 """
 
 from typing import Dict, List, Any, Optional, Union
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
+import atexit
+import functools
+import itertools
 import json
 import os
+import threading
+import time
 from pathlib import Path
 
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
 from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.schema import MetadataMode, QueryBundle, TextNode
 from llama_index.core.storage.docstore import SimpleDocumentStore
 from llama_index.core.storage.index_store import SimpleIndexStore
 from llama_index.core.storage.storage_context import StorageContext
 from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.simple import SimpleVectorStoreData
+from llama_index.core.vector_stores.types import (
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult
+)
 from llama_index.core import (
     VectorStoreIndex, 
-    Document, 
     ServiceContext,
-    Settings
+    Settings,
+    load_index_from_storage
 )
 from llama_index.llms.openai import OpenAI
 from llama_index.embeddings.openai import OpenAIEmbedding
 
+# File name (after the "default__" namespace prefix) for int8-quantised simple stores
+QUANTIZED_VECTOR_STORE_FNAME = "vector_store.q8.json"
+
+# File name (after the "default__" namespace prefix) for per-agent FAISS indexes
+FAISS_VECTOR_STORE_FNAME = "faiss.index"
+
+# Compact JSON for text that gets embedded; indentation only adds tokens
+_compact_json = functools.partial(json.dumps, separators=(",", ":"))
+
+# Query strings used by the get_* helpers. The parameter-free ones are pinned
+# (see _pin_query); formatted ones have unbounded keys and go through the LRU
+PERFORMANCE_QUERY = "performance analysis results recommendations"
+LEARNING_HISTORY_QUERY = "learning insights improvements adaptations"
+HISTORICAL_INSIGHTS_QUERY = "{insight_type} historical data trends patterns"
+USER_PREFERENCES_QUERY = "user preferences {user_id}"
+
+# Agent id -> memory sub-directory (agent type)
+AGENT_MEMORY_TYPES = {
+    "inventory_agent": "inventory",
+    "forecasting_agent": "forecasting",
+    "supplier_agent": "supplier",
+    "orchestrator": "orchestrator"
+}
+
+# Append-only log of nodes inserted since an agent's last full snapshot
+NODE_LOG_FNAME = "nodes.jsonl"
+
+# Append-only log of collaboration events, kept in the orchestrator's memory dir
+COLLABORATION_LOG_FNAME = "collab.jsonl"
+
+class MatrixVectorStore(SimpleVectorStore):
+    """SimpleVectorStore whose default top-k query runs as one matrix-vector product.
+    
+    The stock store scores every node in a Python loop. Here the embeddings are
+    stacked once into a row-normalised float32 matrix (rebuilt only after writes),
+    so a query is a single BLAS call plus an argpartition. On-disk format is
+    unchanged.
+    """
+    
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _matrix_ids: List[str] = PrivateAttr(default_factory=list)
+    
+    def _invalidate(self) -> None:
+        self._matrix = None
+    
+    def add(self, nodes, **add_kwargs):
+        self._invalidate()
+        return super().add(nodes, **add_kwargs)
+    
+    def delete(self, ref_doc_id: str, **delete_kwargs) -> None:
+        self._invalidate()
+        super().delete(ref_doc_id, **delete_kwargs)
+    
+    def delete_nodes(self, node_ids=None, filters=None, **delete_kwargs) -> None:
+        self._invalidate()
+        super().delete_nodes(node_ids, filters, **delete_kwargs)
+    
+    def clear(self) -> None:
+        self._invalidate()
+        super().clear()
+    
+    def _embedding_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            embedding_dict = self.data.embedding_dict
+            self._matrix_ids = list(embedding_dict)
+            matrix = np.asarray(list(embedding_dict.values()), dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._matrix = matrix / norms
+        return self._matrix
+    
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        # Filters, node-id restrictions and learner/MMR modes keep the stock path
+        if (query.mode != VectorStoreQueryMode.DEFAULT or query.filters is not None
+                or query.node_ids is not None or not self.data.embedding_dict):
+            return super().query(query, **kwargs)
+        
+        matrix = self._embedding_matrix()
+        query_vec = np.asarray(query.query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vec)
+        scores = matrix @ (query_vec / query_norm if query_norm > 0 else query_vec)
+        
+        top_k = min(query.similarity_top_k or len(scores), len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        
+        return VectorStoreQueryResult(
+            similarities=scores[top].tolist(),
+            ids=[self._matrix_ids[i] for i in top]
+        )
+
+class QuantizedVectorStore(MatrixVectorStore):
+    """MatrixVectorStore that persists embeddings as int8 codes plus a per-vector scale.
+    
+    Codes are taken from the normalised rows, so cosine scores after a reload
+    differ from the float32 originals only by rounding (about 1/254 per
+    component). JSON ints are a quarter of the size of float reprs and parse faster.
+    """
+    
+    def persist(self, persist_path: str, fs=None) -> None:
+        data = self.data.to_dict()
+        ids = list(self.data.embedding_dict)
+        if ids:
+            matrix = self._embedding_matrix()
+            scales = np.abs(matrix).max(axis=1)
+            scales[scales == 0] = 1.0
+            codes = np.round(matrix / scales[:, None] * 127).astype(np.int8)
+            data["embedding_dict"] = dict(zip(self._matrix_ids, codes.tolist()))
+            data["embedding_scale"] = dict(zip(self._matrix_ids, scales.tolist()))
+        
+        os.makedirs(os.path.dirname(persist_path), exist_ok=True)
+        with open(persist_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+    
+    @classmethod
+    def from_persist_path(cls, persist_path: str, fs=None) -> "QuantizedVectorStore":
+        with open(persist_path, "rb") as f:
+            data = json.load(f)
+        
+        scales = data.pop("embedding_scale", None)
+        if scales:
+            ids = list(data["embedding_dict"])
+            codes = np.asarray([data["embedding_dict"][node_id] for node_id in ids], dtype=np.float32)
+            scale_col = np.asarray([scales[node_id] for node_id in ids], dtype=np.float32)[:, None]
+            data["embedding_dict"] = dict(zip(ids, (codes * scale_col / 127).tolist()))
+        
+        return cls(SimpleVectorStoreData.from_dict(data))
+
 class AgentMemoryManager:
     """Manages persistent memory for specialized agents using LlamaIndex."""
     
-    def __init__(self, memory_dir: str = "./agent_memory"):
+    def __init__(self, memory_dir: str = "./agent_memory",
+                 insert_batch_size: int = 64, flush_interval_s: float = 2.0,
+                 embed_model: Optional[BaseEmbedding] = None,
+                 vector_backend: str = "simple", embed_dim: Optional[int] = None,
+                 quantize_embeddings: bool = False, snapshot_interval_s: float = 300.0):
         self.memory_dir = Path(memory_dir)
         self.memory_dir.mkdir(exist_ok=True)
         
+        # "simple" (in-process cosine scan) or "faiss" (HNSW ANN; needs faiss + llama-index-vector-stores-faiss)
+        self.vector_backend = vector_backend
+        # Dimension of new FAISS indexes; probed from the embed model when not given
+        self.embed_dim = embed_dim
+        # Simple backend only, opt-in: persist embeddings as lossy int8 codes (see QuantizedVectorStore)
+        self.quantize_embeddings = quantize_embeddings
+        
+        # Writes are buffered per agent and flushed (insert + one persist) in batches
+        self.insert_batch_size = insert_batch_size
+        self.flush_interval_s = flush_interval_s
+        # Flushes append to nodes.jsonl; the full JSON stores are rewritten at most this often
+        self.snapshot_interval_s = snapshot_interval_s
+        
         # Initialize LlamaIndex components
-        self._setup_llamaindex()
-        
-        # Agent-specific memory stores
-        self.agent_memories = {
-            "inventory_agent": self._create_agent_memory("inventory"),
-            "forecasting_agent": self._create_agent_memory("forecasting"),
-            "supplier_agent": self._create_agent_memory("supplier"),
-            "orchestrator": self._create_agent_memory("orchestrator")
+        self._setup_llamaindex(embed_model)
+        
+        # Query strings repeat heavily, so their embeddings are memoised
+        # instead of re-requested on every search
+        self._embed_query = functools.lru_cache(maxsize=1024)(self._compute_query_embedding)
+        # Helper query embeddings, kept out of the LRU so ad hoc queries never evict them
+        self._precomputed_embeds = {}
+        # Caps concurrent async retrievals; created on first use inside the running loop
+        self._query_sem = None
+        
+        # Guards lazy loads and the collaboration log. Buffers and indexes are
+        # guarded per agent (see _create_agent_memory), so async retrievals on
+        # worker threads only contend with writes to the same agent
+        self._lock = threading.Lock()
+        
+        # Agent-specific memory stores, loaded on first use (see _get_agent)
+        self._agent_factories = {
+            agent_id: (lambda agent_type=agent_type: self._create_agent_memory(agent_type))
+            for agent_id, agent_type in AGENT_MEMORY_TYPES.items()
         }
+        self.agent_memories = {}
         
         # Conversation memory
         self.conversation_memory = ChatMemoryBuffer.from_defaults(token_limit=4000)
         
-        # Agent collaboration history
-        self.collaboration_history = []
+        # Agent collaboration history: recent events in memory, full history in the JSONL log
+        self.collaboration_history = deque(maxlen=10_000)
+        # Per-agent view (as sender or recipient) so context lookups skip the full history
+        self._collab_by_agent = defaultdict(lambda: deque(maxlen=1000))
+        self._collab_log = self._open_collaboration_log()
+        
+        # On-disk size per agent for get_memory_stats: bumped on log appends,
+        # fully re-scanned at most every _stats_ttl seconds
+        self._agent_sizes = {}
+        self._stats_ts = 0.0
+        self._stats_ttl = 60.0
+        
+        # Make sure buffered nodes reach disk on interpreter exit
+        atexit.register(self._flush_all)
     
-    def _setup_llamaindex(self):
+    def _setup_llamaindex(self, embed_model: Optional[BaseEmbedding] = None):
         """Setup LlamaIndex components for memory persistence."""
         # Configure LlamaIndex settings
         Settings.llm = OpenAI(model="gpt-4", temperature=0.1)
-        Settings.embed_model = OpenAIEmbedding(model="text-embedding-ada-002")
+        self.embed_model = embed_model or self._default_embed_model()
+        Settings.embed_model = self.embed_model
         
         # Create storage context for persistence
         self.storage_context = StorageContext.from_defaults(
@@ -60,37 +249,325 @@ class AgentMemoryManager:
             vector_store=SimpleVectorStore()
         )
     
+    def _compute_query_embedding(self, text: str) -> List[float]:
+        """Embed a query string with the configured embed model (uncached)."""
+        return self.embed_model.get_query_embedding(text)
+    
+    def _pin_query(self, query: str) -> str:
+        """Embed a helper query once and keep it for the manager's lifetime."""
+        if query not in self._precomputed_embeds:
+            self._precomputed_embeds[query] = self._compute_query_embedding(query)
+        return query
+    
+    def warmup_query_cache(self, queries: Optional[List[str]] = None) -> None:
+        """Pre-embed query strings (default: the fixed helper queries) so their first retrieval skips the embedder."""
+        if queries is None:
+            queries = [PERFORMANCE_QUERY, LEARNING_HISTORY_QUERY]
+        for query in queries:
+            self._pin_query(query)
+    
+    def _default_embed_model(self) -> BaseEmbedding:
+        """Pick the embedder: a TEI server if TEI_URL is set, otherwise batched OpenAI."""
+        tei_url = os.getenv("TEI_URL", "").strip()
+        if tei_url:
+            # Import lazily; the TEI integration is an optional extra. Never fall
+            # back to OpenAI here: the operator chose to keep memory text local
+            try:
+                from llama_index.embeddings.text_embeddings_inference import TextEmbeddingsInference  # type: ignore
+            except ImportError as e:
+                raise ImportError(
+                    "TEI_URL is set but llama-index-embeddings-text-embeddings-inference is not installed"
+                ) from e
+            return TextEmbeddingsInference(base_url=tei_url, embed_batch_size=128)
+        
+        return OpenAIEmbedding(model="text-embedding-ada-002", embed_batch_size=64)
+    
+    def _get_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Return an agent's memory store, loading it from disk on first access."""
+        agent_memory = self.agent_memories.get(agent_id)
+        if agent_memory is None:
+            factory = self._agent_factories.get(agent_id)
+            if factory is None:
+                return None
+            with self._lock:
+                # Another thread may have finished loading it while we waited
+                agent_memory = self.agent_memories.get(agent_id)
+                if agent_memory is None:
+                    agent_memory = self.agent_memories[agent_id] = factory()
+        return agent_memory
+    
+    def preload_agents(self, agent_ids: Optional[List[str]] = None) -> None:
+        """Load several agents' memory stores concurrently (each load is mostly file I/O and parsing)."""
+        to_load = [
+            agent_id for agent_id in (agent_ids or self._agent_factories)
+            if agent_id in self._agent_factories and agent_id not in self.agent_memories
+        ]
+        if not to_load:
+            return
+        
+        with ThreadPoolExecutor(max_workers=len(to_load)) as pool:
+            loaded = list(pool.map(lambda agent_id: self._agent_factories[agent_id](), to_load))
+        with self._lock:
+            # Keep any store loaded (and possibly written to) by another thread meanwhile
+            for agent_id, agent_memory in zip(to_load, loaded):
+                self.agent_memories.setdefault(agent_id, agent_memory)
+    
     def _create_agent_memory(self, agent_type: str) -> Dict[str, Any]:
         """Create memory store for a specific agent."""
         agent_memory_dir = self.memory_dir / agent_type
         agent_memory_dir.mkdir(exist_ok=True)
         
-        # Create agent-specific storage
-        storage_context = StorageContext.from_defaults(
-            docstore=SimpleDocumentStore.from_persist_dir(str(agent_memory_dir)),
-            index_store=SimpleIndexStore.from_persist_dir(str(agent_memory_dir)),
-            vector_store=SimpleVectorStore.from_persist_dir(str(agent_memory_dir))
-        )
-        
-        # Create vector index for semantic search
-        index = VectorStoreIndex.from_vector_store(
-            storage_context.vector_store,
-            storage_context=storage_context
-        )
+        if (agent_memory_dir / "index_store.json").exists():
+            # Reload the persisted stores and the vector index built over them
+            storage_context = StorageContext.from_defaults(
+                docstore=SimpleDocumentStore.from_persist_dir(str(agent_memory_dir)),
+                index_store=SimpleIndexStore.from_persist_dir(str(agent_memory_dir)),
+                vector_store=self._load_vector_store(agent_memory_dir)
+            )
+            index = load_index_from_storage(storage_context)
+        else:
+            # First use: start an empty vector index for semantic search
+            storage_context = StorageContext.from_defaults(
+                docstore=SimpleDocumentStore(),
+                index_store=SimpleIndexStore(),
+                vector_store=self._load_vector_store(agent_memory_dir)
+            )
+            index = VectorStoreIndex(nodes=[], storage_context=storage_context)
+        
+        # Replay nodes appended after the last snapshot. A crash between a snapshot
+        # and the log truncate leaves entries the snapshot already holds; skip those,
+        # since re-adding them would duplicate their vectors in a FAISS index
+        log_path = agent_memory_dir / NODE_LOG_FNAME
+        docstore = storage_context.docstore
+        replayed = [
+            node for node in self._replay_node_log(log_path)
+            if not docstore.document_exists(node.node_id)
+        ]
+        if replayed:
+            index.insert_nodes(replayed)
         
         return {
             "index": index,
             "storage_context": storage_context,
             "chat_memory": ChatMemoryBuffer.from_defaults(token_limit=2000),
             "agent_type": agent_type,
-            "memory_dir": agent_memory_dir
+            "memory_dir": agent_memory_dir,
+            "pending_nodes": [],
+            "pending_since": 0.0,
+            "log_dirty": bool(replayed),
+            "log_size": log_path.stat().st_size if log_path.exists() else 0,
+            "last_snapshot": time.monotonic(),
+            # "lock" guards the buffer, index and node log; "flush_lock" keeps one
+            # flush per agent in flight and is held across the embedding call
+            "lock": threading.Lock(),
+            "flush_lock": threading.Lock()
         }
     
+    def _replay_node_log(self, log_path: Path) -> List[TextNode]:
+        """Read the nodes recorded in an agent's append-only node log."""
+        if not log_path.exists():
+            return []
+        
+        nodes = []
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted append
+                    continue
+                nodes.append(TextNode(
+                    id_=entry["id"],
+                    text=entry["text"],
+                    metadata=entry["metadata"],
+                    embedding=entry["embedding"]
+                ))
+        return nodes
+    
+    def _load_vector_store(self, agent_memory_dir: Path):
+        """Load (or create) the vector store backing an agent's memory index."""
+        if self.vector_backend != "faiss":
+            store_cls = QuantizedVectorStore if self.quantize_embeddings else MatrixVectorStore
+            # Both files can exist after the setting is toggled; the newer one holds the latest snapshot
+            candidates = [
+                path for path in (agent_memory_dir / f"default__{QUANTIZED_VECTOR_STORE_FNAME}",
+                                  agent_memory_dir / "default__vector_store.json")
+                if path.exists()
+            ]
+            if not candidates:
+                return store_cls()
+            latest = max(candidates, key=lambda path: path.stat().st_mtime)
+            if latest.name.endswith(QUANTIZED_VECTOR_STORE_FNAME):
+                loaded = QuantizedVectorStore.from_persist_path(str(latest))
+                # Re-wrap so persists use the configured format
+                return store_cls(data=loaded.data)
+            return store_cls.from_persist_path(str(latest))
+        
+        # Import lazily so the default backend has no FAISS dependency
+        import faiss  # type: ignore
+        from llama_index.vector_stores.faiss import FaissVectorStore  # type: ignore
+        
+        faiss_path = agent_memory_dir / f"default__{FAISS_VECTOR_STORE_FNAME}"
+        if faiss_path.exists():
+            vector_store = FaissVectorStore.from_persist_path(str(faiss_path))
+            vector_store.client.hnsw.efSearch = 40
+            return vector_store
+        
+        # HNSW graph: O(log N) queries instead of a linear scan over every node
+        faiss_index = faiss.IndexHNSWFlat(self._embedding_dim(), 32)
+        faiss_index.hnsw.efConstruction = 64
+        faiss_index.hnsw.efSearch = 40
+        return FaissVectorStore(faiss_index=faiss_index)
+    
+    def _embedding_dim(self) -> int:
+        """Return the embed model's output dimension, probing it with one embedding on first use."""
+        if self.embed_dim is None:
+            self.embed_dim = len(self.embed_model.get_text_embedding("embedding dimension probe"))
+        return self.embed_dim
+    
+    def _append_node_log(self, agent_memory: Dict[str, Any], nodes: List[TextNode]) -> None:
+        """Durably append newly inserted nodes to an agent's node log."""
+        lines = [
+            json.dumps({
+                "id": node.node_id,
+                "text": node.text,
+                "metadata": node.metadata,
+                "embedding": node.embedding
+            }, default=str) + "\n"
+            for node in nodes
+        ]
+        with open(agent_memory["memory_dir"] / NODE_LOG_FNAME, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            written = f.tell()
+        agent_memory["log_dirty"] = True
+        
+        agent_type = agent_memory["agent_type"]
+        if agent_type in self._agent_sizes:
+            self._agent_sizes[agent_type] += written - agent_memory["log_size"]
+        else:
+            self._stats_ts = 0.0
+        agent_memory["log_size"] = written
+    
+    def _snapshot(self, agent_memory: Dict[str, Any]) -> None:
+        """Rewrite an agent's full stores and truncate its node log."""
+        self._persist(agent_memory)
+        # Entries that survive a crash before this truncate are skipped on replay (see _create_agent_memory)
+        open(agent_memory["memory_dir"] / NODE_LOG_FNAME, "w").close()
+        agent_memory["log_dirty"] = False
+        agent_memory["log_size"] = 0
+        # Snapshot sizes are not tracked incrementally; rescan on the next stats call
+        self._stats_ts = 0.0
+        agent_memory["last_snapshot"] = time.monotonic()
+    
+    def _persist(self, agent_memory: Dict[str, Any]) -> None:
+        """Write an agent's storage context to its memory directory."""
+        if self.vector_backend == "faiss":
+            agent_memory["storage_context"].persist(
+                persist_dir=str(agent_memory["memory_dir"]),
+                vector_store_fname=FAISS_VECTOR_STORE_FNAME
+            )
+        elif self.quantize_embeddings:
+            # Any float32 store is left in place; loads pick whichever file is newer
+            agent_memory["storage_context"].persist(
+                persist_dir=str(agent_memory["memory_dir"]),
+                vector_store_fname=QUANTIZED_VECTOR_STORE_FNAME
+            )
+        else:
+            agent_memory["storage_context"].persist(persist_dir=str(agent_memory["memory_dir"]))
+    
+    def _enqueue(self, agent_id: str, node: TextNode) -> None:
+        """Buffer a node for an agent, flushing once the batch is full or stale."""
+        agent_memory = self._get_agent(agent_id)
+        if not agent_memory:
+            raise ValueError(f"Unknown agent: {agent_id}")
+        with agent_memory["lock"]:
+            pending = agent_memory["pending_nodes"]
+            now = time.monotonic()
+            if not pending:
+                agent_memory["pending_since"] = now
+            pending.append(node)
+            due = (len(pending) >= self.insert_batch_size
+                   or now - agent_memory["pending_since"] > self.flush_interval_s)
+        
+        if due:
+            self._flush(agent_id)
+    
+    def _flush(self, agent_id: str) -> None:
+        """Embed and insert an agent's buffered nodes and append them to its node log."""
+        agent_memory = self.agent_memories.get(agent_id)
+        if not agent_memory:
+            return
+        
+        # Waiting on an in-flight flush keeps read-your-writes for retrievals
+        with agent_memory["flush_lock"]:
+            with agent_memory["lock"]:
+                nodes = agent_memory["pending_nodes"]
+                if not nodes:
+                    return
+                agent_memory["pending_nodes"] = []
+            
+            # One batched embedding call per flush, made without holding the agent
+            # lock so stores and searches continue during the round-trip. The nodes
+            # arrive pre-embedded, so the index only adds them to its stores
+            try:
+                embeddings = self.embed_model.get_text_embedding_batch(
+                    [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+                )
+            except Exception:
+                self._requeue(agent_memory, nodes)
+                raise
+            for node, embedding in zip(nodes, embeddings):
+                node.embedding = embedding
+            
+            with agent_memory["lock"]:
+                try:
+                    agent_memory["index"].insert_nodes(nodes)
+                except Exception:
+                    self._requeue(agent_memory, nodes)
+                    raise
+                self._append_node_log(agent_memory, nodes)
+                if time.monotonic() - agent_memory["last_snapshot"] > self.snapshot_interval_s:
+                    self._snapshot(agent_memory)
+        
+        if agent_id == "orchestrator":
+            # Collaboration events are queued as orchestrator nodes; make their log as durable as the node log
+            self._sync_collaboration_log()
+    
+    def _requeue(self, agent_memory: Dict[str, Any], nodes: List[TextNode]) -> None:
+        """Put a failed batch back ahead of anything queued meanwhile so the next flush retries it."""
+        with agent_memory["lock"]:
+            agent_memory["pending_nodes"] = nodes + agent_memory["pending_nodes"]
+    
+    def _flush_all(self) -> None:
+        """Flush buffered nodes for every loaded agent and snapshot their stores."""
+        for agent_id, agent_memory in list(self.agent_memories.items()):
+            self._flush(agent_id)
+            with agent_memory["lock"]:
+                if agent_memory["log_dirty"]:
+                    self._snapshot(agent_memory)
+        self._sync_collaboration_log()
+    
+    def _sync_collaboration_log(self) -> None:
+        """Flush and fsync buffered collaboration log appends."""
+        with self._lock:
+            if not self._collab_log.closed:
+                self._collab_log.flush()
+                os.fsync(self._collab_log.fileno())
+    
+    def _open_collaboration_log(self):
+        """Open the orchestrator's collaboration log for buffered appends."""
+        log_dir = self.memory_dir / AGENT_MEMORY_TYPES["orchestrator"]
+        log_dir.mkdir(exist_ok=True)
+        log_path = log_dir / COLLABORATION_LOG_FNAME
+        return open(log_path, "a", encoding="utf-8")
+    
     def store_agent_interaction(self, agent_id: str, interaction_type: str, 
                               data: Dict[str, Any], user_input: str = None, 
                               response: str = None) -> str:
         """Store an agent interaction in persistent memory."""
-        agent_memory = self.agent_memories.get(agent_id)
+        agent_memory = self._get_agent(agent_id)
         if not agent_memory:
             raise ValueError(f"Unknown agent: {agent_id}")
         
@@ -104,9 +581,9 @@ class AgentMemoryManager:
             "response": response
         }
         
-        # Create LlamaIndex document
+        # Create LlamaIndex node (one chunk per interaction)
         doc_text = self._format_interaction_for_memory(interaction_doc)
-        document = Document(
+        node = TextNode(
             text=doc_text,
             metadata={
                 "agent_id": agent_id,
@@ -115,8 +592,8 @@ class AgentMemoryManager:
             }
         )
         
-        # Add to agent's memory index
-        agent_memory["index"].insert(document)
+        # Queue for the agent's memory index
+        self._enqueue(agent_id, node)
         
         # Add to chat memory
         if user_input and response:
@@ -124,9 +601,6 @@ class AgentMemoryManager:
                 f"User: {user_input}\nAgent: {response}"
             )
         
-        # Persist to disk
-        agent_memory["storage_context"].persist(persist_dir=str(agent_memory["memory_dir"]))
-        
         return f"Stored interaction for {agent_id}"
     
     def store_collaboration_event(self, sender_agent: str, recipient_agent: str, 
@@ -140,39 +614,46 @@ class AgentMemoryManager:
             "data": data
         }
         
-        # Store in collaboration history
+        # Store in collaboration history and append to the durable log
         self.collaboration_history.append(collaboration_event)
+        self._collab_by_agent[sender_agent].append(collaboration_event)
+        if recipient_agent != sender_agent:
+            self._collab_by_agent[recipient_agent].append(collaboration_event)
+        with self._lock:
+            self._collab_log.write(json.dumps(collaboration_event, default=str) + "\n")
         
         # Store in orchestrator memory
-        orchestrator_memory = self.agent_memories["orchestrator"]
         doc_text = f"Collaboration: {sender_agent} -> {recipient_agent} ({message_type})"
-        document = Document(
+        node = TextNode(
             text=doc_text,
             metadata=collaboration_event
         )
-        orchestrator_memory["index"].insert(document)
-        
-        # Persist orchestrator memory
-        orchestrator_memory["storage_context"].persist(
-            persist_dir=str(orchestrator_memory["memory_dir"])
-        )
+        self._enqueue("orchestrator", node)
         
         return f"Stored collaboration: {sender_agent} -> {recipient_agent}"
     
     def retrieve_agent_memory(self, agent_id: str, query: str, 
                              limit: int = 5) -> List[Dict[str, Any]]:
         """Retrieve relevant memories for an agent using semantic search."""
-        agent_memory = self.agent_memories.get(agent_id)
+        agent_memory = self._get_agent(agent_id)
         if not agent_memory:
             return []
         
-        # Perform semantic search
-        query_engine = agent_memory["index"].as_query_engine(similarity_top_k=limit)
-        response = query_engine.query(query)
+        # Perform semantic search (retrieval only; no LLM synthesis is needed)
+        retriever = VectorIndexRetriever(index=agent_memory["index"], similarity_top_k=limit)
+        embedding = self._precomputed_embeds.get(query)
+        if embedding is None:
+            embedding = self._embed_query(query)
+        query_bundle = QueryBundle(query_str=query, embedding=embedding)
+        
+        # Read-your-writes: buffered nodes must be searchable
+        self._flush(agent_id)
+        with agent_memory["lock"]:
+            retrieved = retriever.retrieve(query_bundle)
         
         # Extract relevant memories
         memories = []
-        for node in response.source_nodes:
+        for node in retrieved:
             memories.append({
                 "text": node.text,
                 "metadata": node.metadata,
@@ -181,9 +662,17 @@ class AgentMemoryManager:
         
         return memories
     
+    async def retrieve_agent_memory_async(self, agent_id: str, query: str,
+                                          limit: int = 5) -> List[Dict[str, Any]]:
+        """Async retrieve_agent_memory; the embedding call runs off the event loop."""
+        if self._query_sem is None:
+            self._query_sem = asyncio.Semaphore(10)
+        async with self._query_sem:
+            return await asyncio.to_thread(self.retrieve_agent_memory, agent_id, query, limit)
+    
     def get_agent_context(self, agent_id: str, context_type: str = "recent") -> Dict[str, Any]:
         """Get contextual information for an agent."""
-        agent_memory = self.agent_memories.get(agent_id)
+        agent_memory = self._get_agent(agent_id)
         if not agent_memory:
             return {}
         
@@ -196,20 +685,18 @@ class AgentMemoryManager:
             }
         
         elif context_type == "collaboration":
-            # Get collaboration history
-            collaboration_events = [
-                event for event in self.collaboration_history 
-                if event["sender"] == agent_id or event["recipient"] == agent_id
-            ]
+            agent_events = self._collab_by_agent.get(agent_id, ())
+            collaboration_events = list(itertools.islice(reversed(agent_events), 10))
+            collaboration_events.reverse()
             return {
-                "collaboration_history": collaboration_events[-10:],  # Last 10 events
+                "collaboration_history": collaboration_events,  # Last 10 events
                 "agent_type": agent_memory["agent_type"]
             }
         
         elif context_type == "performance":
             # Get performance-related memories
             performance_memories = self.retrieve_agent_memory(
-                agent_id, "performance analysis results recommendations", limit=10
+                agent_id, self._pin_query(PERFORMANCE_QUERY), limit=10
             )
             return {
                 "performance_memories": performance_memories,
@@ -218,6 +705,16 @@ class AgentMemoryManager:
         
         return {}
     
+    async def get_multi_agent_performance(self, agent_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch performance memories for several agents concurrently."""
+        # Pinning may embed the query, a blocking network call
+        query = await asyncio.to_thread(self._pin_query, PERFORMANCE_QUERY)
+        results = await asyncio.gather(*[
+            self.retrieve_agent_memory_async(agent_id, query, 10)
+            for agent_id in agent_ids
+        ])
+        return dict(zip(agent_ids, results))
+    
     def store_analysis_results(self, agent_id: str, analysis_type: str, 
                              results: Dict[str, Any], recommendations: List[str] = None) -> str:
         """Store analysis results for future reference."""
@@ -230,11 +727,11 @@ class AgentMemoryManager:
         }
         
         # Store in agent memory
-        doc_text = f"Analysis Results ({analysis_type}): {json.dumps(results, indent=2)}"
+        doc_text = f"Analysis Results ({analysis_type}): {_compact_json(results)}"
         if recommendations:
             doc_text += f"\nRecommendations: {', '.join(recommendations)}"
         
-        document = Document(
+        node = TextNode(
             text=doc_text,
             metadata={
                 "agent_id": agent_id,
@@ -243,18 +740,14 @@ class AgentMemoryManager:
             }
         )
         
-        agent_memory = self.agent_memories[agent_id]
-        agent_memory["index"].insert(document)
-        agent_memory["storage_context"].persist(
-            persist_dir=str(agent_memory["memory_dir"])
-        )
+        self._enqueue(agent_id, node)
         
         return f"Stored {analysis_type} analysis results for {agent_id}"
     
     def get_historical_insights(self, agent_id: str, insight_type: str) -> List[Dict[str, Any]]:
         """Get historical insights of a specific type."""
         insights = self.retrieve_agent_memory(
-            agent_id, f"{insight_type} historical data trends patterns", limit=10
+            agent_id, HISTORICAL_INSIGHTS_QUERY.format(insight_type=insight_type), limit=10
         )
         return insights
     
@@ -267,24 +760,21 @@ class AgentMemoryManager:
         }
         
         # Store in orchestrator memory (user preferences are global)
-        orchestrator_memory = self.agent_memories["orchestrator"]
-        doc_text = f"User Preferences: {json.dumps(preferences, indent=2)}"
-        document = Document(
+        doc_text = f"User Preferences: {_compact_json(preferences)}"
+        node = TextNode(
             text=doc_text,
             metadata=preferences_doc
         )
         
-        orchestrator_memory["index"].insert(document)
-        orchestrator_memory["storage_context"].persist(
-            persist_dir=str(orchestrator_memory["memory_dir"])
-        )
+        self._enqueue("orchestrator", node)
         
         return f"Stored preferences for user {user_id}"
     
     def get_user_preferences(self, user_id: str) -> Dict[str, Any]:
         """Retrieve user preferences."""
+        # Per-user query strings are unbounded, so they use the LRU rather than being pinned
         preferences = self.retrieve_agent_memory(
-            "orchestrator", f"user preferences {user_id}", limit=1
+            "orchestrator", USER_PREFERENCES_QUERY.format(user_id=user_id), limit=1
         )
         
         if preferences:
@@ -303,88 +793,100 @@ class AgentMemoryManager:
             "timestamp": datetime.now().isoformat()
         }
         
-        agent_memory = self.agent_memories[agent_id]
-        doc_text = f"Learning Insight: {insight}\nContext: {json.dumps(context, indent=2)}"
-        document = Document(
+        doc_text = f"Learning Insight: {insight}\nContext: {_compact_json(context)}"
+        node = TextNode(
             text=doc_text,
             metadata=learning_doc
         )
         
-        agent_memory["index"].insert(document)
-        agent_memory["storage_context"].persist(
-            persist_dir=str(agent_memory["memory_dir"])
-        )
+        self._enqueue(agent_id, node)
         
         return f"Stored learning insight for {agent_id}"
     
     def get_agent_learning_history(self, agent_id: str) -> List[Dict[str, Any]]:
         """Get learning history for an agent."""
         return self.retrieve_agent_memory(
-            agent_id, "learning insights improvements adaptations", limit=20
+            agent_id, self._pin_query(LEARNING_HISTORY_QUERY), limit=20
         )
     
     def _format_interaction_for_memory(self, interaction: Dict[str, Any]) -> str:
         """Format interaction data for storage in memory."""
-        formatted_text = f"""
-Agent: {interaction['agent_id']}
-Type: {interaction['interaction_type']}
-Timestamp: {interaction['timestamp']}
-"""
+        parts = [
+            f"\nAgent: {interaction['agent_id']}\n"
+            f"Type: {interaction['interaction_type']}\n"
+            f"Timestamp: {interaction['timestamp']}\n"
+        ]
         
         if interaction.get('user_input'):
-            formatted_text += f"User Input: {interaction['user_input']}\n"
+            parts.append(f"User Input: {interaction['user_input']}\n")
         
         if interaction.get('response'):
-            formatted_text += f"Response: {interaction['response']}\n"
+            parts.append(f"Response: {interaction['response']}\n")
         
         if interaction.get('data'):
-            formatted_text += f"Data: {json.dumps(interaction['data'], indent=2)}\n"
+            parts.append(f"Data: {_compact_json(interaction['data'])}\n")
         
-        return formatted_text
+        return "".join(parts)
     
     def get_memory_stats(self) -> Dict[str, Any]:
         """Get statistics about memory usage."""
         stats = {
-            "total_agents": len(self.agent_memories),
+            "total_agents": len(self._agent_factories),
             "collaboration_events": len(self.collaboration_history),
             "agent_memories": {}
         }
         
-        for agent_id, memory in self.agent_memories.items():
-            # Get approximate memory size
-            memory_dir = memory["memory_dir"]
-            if memory_dir.exists():
-                total_size = sum(f.stat().st_size for f in memory_dir.rglob('*') if f.is_file())
+        # Sizes come from disk, so idle agents are not loaded just to report them
+        now = time.monotonic()
+        if now - self._stats_ts > self._stats_ttl:
+            self._agent_sizes = {
+                agent_type: sum(f.stat().st_size for f in (self.memory_dir / agent_type).rglob('*') if f.is_file())
+                for agent_type in AGENT_MEMORY_TYPES.values()
+                if (self.memory_dir / agent_type).exists()
+            }
+            self._stats_ts = now
+        
+        for agent_id, agent_type in AGENT_MEMORY_TYPES.items():
+            if agent_type in self._agent_sizes:
                 stats["agent_memories"][agent_id] = {
-                    "memory_dir": str(memory_dir),
-                    "size_bytes": total_size,
-                    "agent_type": memory["agent_type"]
+                    "memory_dir": str(self.memory_dir / agent_type),
+                    "size_bytes": self._agent_sizes[agent_type],
+                    "agent_type": agent_type
                 }
         
         return stats
     
     def clear_agent_memory(self, agent_id: str) -> str:
         """Clear all memory for a specific agent."""
-        if agent_id not in self.agent_memories:
+        if agent_id not in self._agent_factories:
             return f"Agent {agent_id} not found"
         
-        agent_memory = self.agent_memories[agent_id]
-        memory_dir = agent_memory["memory_dir"]
+        with self._lock:
+            # Drop the loaded store (and anything still buffered for it)
+            agent_memory = self.agent_memories.pop(agent_id, None)
+        memory_dir = self.memory_dir / AGENT_MEMORY_TYPES[agent_id]
         
-        # Clear the memory directory
-        if memory_dir.exists():
-            import shutil
-            shutil.rmtree(memory_dir)
-            memory_dir.mkdir(exist_ok=True)
-        
-        # Recreate the memory store
-        self.agent_memories[agent_id] = self._create_agent_memory(agent_memory["agent_type"])
+        # Let an in-flight flush finish before its directory goes away
+        flush_lock = agent_memory["flush_lock"] if agent_memory else threading.Lock()
+        with flush_lock, self._lock:
+            # Clear the memory directory
+            if memory_dir.exists():
+                import shutil
+                if agent_id == "orchestrator":
+                    self._collab_log.close()
+                shutil.rmtree(memory_dir)
+                memory_dir.mkdir(exist_ok=True)
+            
+            # The memory store is recreated empty on next access
+            if agent_id == "orchestrator":
+                self._collab_log = self._open_collaboration_log()
+        self._stats_ts = 0.0
         
         return f"Cleared memory for agent {agent_id}"
     
     def export_memory(self, agent_id: str, export_path: str) -> str:
         """Export agent memory to a file."""
-        if agent_id not in self.agent_memories:
+        if agent_id not in self._agent_factories:
             return f"Agent {agent_id} not found"
         
         # Get all memories for the agent
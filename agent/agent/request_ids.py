@@ -0,0 +1,15 @@
+"""
+Collaboration request IDs shared by the specialized agents.
+"""
+
+import itertools
+import os
+import time
+
+# Per-process session prefix plus a monotonic counter (no clock read per request)
+_SESSION = f"{int(time.time())}-{os.getpid()}"
+_REQ_COUNTER = itertools.count()
+
+def next_request_id(agent_id: str) -> str:
+    """Return a process-unique request ID for an agent's collaboration message."""
+    return f"{agent_id}:{_SESSION}:{next(_REQ_COUNTER)}"
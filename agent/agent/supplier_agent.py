@@ -4,8 +4,65 @@ Specialized agent for supplier evaluation, performance tracking, and procurement
 """
 
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
-import json
+import bisect
+import functools
+import heapq
+import operator
+
+from .request_ids import next_request_id
+
+# Performance tier by overall score: < 0.6 poor, < 0.8 average, < 0.9 good, otherwise excellent
+PERFORMANCE_TIER_THRESHOLDS = (0.6, 0.8, 0.9)
+PERFORMANCE_TIER_LABELS = ("poor", "average", "good", "excellent")
+
+# Cost score by unit cost: < 10 -> 1.0, < 25 -> 0.8, < 50 -> 0.6, otherwise 0.4
+COST_SCORE_THRESHOLDS = (10, 25, 50)
+COST_SCORES = (1.0, 0.8, 0.6, 0.4)
+
+# Regions treated as geographic (shipping-delay) risk
+GEOGRAPHIC_RISK_LOCATIONS = frozenset({"Asia Pacific", "Europe"})
+
+# Mitigation strategy per risk type
+MITIGATION_STRATEGIES = {
+    "geographic": "Diversify supplier base across multiple regions",
+    "single_source": "Identify and qualify backup suppliers",
+    "financial": "Monitor supplier financial health regularly",
+    "compliance": "Require specific certifications in contracts"
+}
+
+@functools.lru_cache(maxsize=64)
+def _mitigation_strategies(risk_types: tuple) -> tuple:
+    """Strategies for a sequence of risk types (suppliers share a few combinations)."""
+    return tuple(MITIGATION_STRATEGIES[t] for t in risk_types if t in MITIGATION_STRATEGIES)
+
+# Risk level indexed by (score > 0.4) + (score > 0.7)
+RISK_LEVEL_LABELS = ("low", "medium", "high")
+
+# C-level sort keys for ranking candidates
+_by_score = operator.itemgetter(0)  # (score, supplier) pairs
+_by_tco = operator.itemgetter('tco')
+
+# Certification bits, set when the name appears in a supplier's certifications (string or list)
+CERT_ISO_9001 = 1
+CERT_FDA = 2
+CERT_ISO_14001 = 4
+_CERT_NAMES = (("ISO 9001", CERT_ISO_9001), ("FDA Certified", CERT_FDA), ("ISO 14001", CERT_ISO_14001))
+
+def _cert_mask(certifications) -> int:
+    """Return the CERT_* bitmask of a certifications string or list."""
+    if not isinstance(certifications, str):
+        # Lists (the canvas schema's string[]) are not hashable; a tuple has the same membership tests
+        certifications = tuple(certifications)
+    return _scan_cert_mask(certifications)
+
+@functools.lru_cache(maxsize=256)
+def _scan_cert_mask(certifications) -> int:
+    """Scan certifications once and return its CERT_* bitmask."""
+    mask = 0
+    for name, bit in _CERT_NAMES:
+        if name in certifications:
+            mask |= bit
+    return mask
 
 class SupplierAgent:
     """Specialized agent for supplier management and optimization."""
@@ -24,15 +81,23 @@ class SupplierAgent:
     def analyze_supplier_performance(self, supplier_data: List[Dict]) -> Dict[str, Any]:
         """Analyze supplier performance across multiple metrics."""
         performance_analysis = {}
+        delivery_score_of = self._calculate_delivery_score
+        quality_score_of = self._calculate_quality_score
+        cost_score_of = self._calculate_cost_score
+        categorize = self._categorize_performance
+        recommend = self._generate_supplier_recommendations
         
+        # Each field is read once and shared by the scores and recommendations
         for supplier in supplier_data:
             supplier_id = supplier.get('id')
+            delivery_time = supplier.get('delivery_time', 0)
+            reliability_score = supplier.get('reliability_score', 0)
+            cert_mask = _cert_mask(supplier.get('certifications', ''))
             
             # Calculate performance scores
-            delivery_score = self._calculate_delivery_score(supplier)
-            quality_score = self._calculate_quality_score(supplier)
-            cost_score = self._calculate_cost_score(supplier)
-            reliability_score = supplier.get('reliability_score', 0)
+            delivery_score = delivery_score_of(delivery_time, supplier.get('on_time_delivery_rate', 100))
+            quality_score = quality_score_of(cert_mask)
+            cost_score = cost_score_of(supplier.get('unit_cost', 0))
             
             # Overall performance score (weighted average)
             overall_score = (
@@ -49,8 +114,8 @@ class SupplierAgent:
                 "quality_score": quality_score,
                 "cost_score": cost_score,
                 "reliability_score": reliability_score,
-                "performance_tier": self._categorize_performance(overall_score),
-                "recommendations": self._generate_supplier_recommendations(supplier, overall_score)
+                "performance_tier": categorize(overall_score),
+                "recommendations": recommend(overall_score, reliability_score, cert_mask, delivery_time)
             }
         
         return {"supplier_performance": performance_analysis}
@@ -60,13 +125,12 @@ class SupplierAgent:
         risk_assessment = {}
         
         for supplier in supplier_data:
-            supplier_id = supplier.get('id')
+            reliability = supplier.get('reliability_score', 0)
             risks = []
             risk_score = 0
             
             # Geographic risk
-            location = supplier.get('location', '')
-            if location in ['Asia Pacific', 'Europe']:  # Example risk factors
+            if supplier.get('location', '') in GEOGRAPHIC_RISK_LOCATIONS:  # Example risk factors
                 risks.append({
                     "type": "geographic",
                     "description": "International supplier with potential shipping delays",
@@ -84,7 +148,6 @@ class SupplierAgent:
                 risk_score += 0.5
             
             # Financial risk
-            reliability = supplier.get('reliability_score', 0)
             if reliability < 70:
                 risks.append({
                     "type": "financial",
@@ -94,8 +157,7 @@ class SupplierAgent:
                 risk_score += 0.4 if reliability < 50 else 0.2
             
             # Compliance risk
-            certifications = supplier.get('certifications', '')
-            if 'ISO 9001' not in certifications:
+            if not _cert_mask(supplier.get('certifications', '')) & CERT_ISO_9001:
                 risks.append({
                     "type": "compliance",
                     "description": "Missing key quality certifications",
@@ -103,10 +165,10 @@ class SupplierAgent:
                 })
                 risk_score += 0.2
             
-            risk_assessment[supplier_id] = {
+            risk_assessment[supplier.get('id')] = {
                 "supplier_name": supplier.get('name'),
                 "risk_score": round(risk_score, 2),
-                "risk_level": "high" if risk_score > 0.7 else "medium" if risk_score > 0.4 else "low",
+                "risk_level": RISK_LEVEL_LABELS[(risk_score > 0.4) + (risk_score > 0.7)],
                 "risks": risks,
                 "mitigation_strategies": self._generate_mitigation_strategies(risks)
             }
@@ -116,35 +178,45 @@ class SupplierAgent:
     def optimize_procurement(self, supplier_data: List[Dict], requirements: Dict) -> Dict[str, Any]:
         """Optimize procurement decisions based on supplier performance and requirements."""
         procurement_recommendations = []
+        catalog = self._index_supplier_products(supplier_data)
+        # A supplier's score depends only on whether the item is urgent, not on the item
+        score_cache = {}
         
         for requirement in requirements.get('items', []):
             item_name = requirement.get('item_name')
             quantity = requirement.get('quantity', 1)
             urgency = requirement.get('urgency', 'medium')
             
-            # Find suitable suppliers
-            suitable_suppliers = []
-            for supplier in supplier_data:
-                if self._supplier_can_fulfill(supplier, requirement):
-                    score = self._calculate_procurement_score(supplier, requirement)
-                    suitable_suppliers.append({
-                        "supplier_id": supplier.get('id'),
-                        "supplier_name": supplier.get('name'),
-                        "score": score,
-                        "delivery_time": supplier.get('delivery_time', 0),
-                        "cost": supplier.get('unit_cost', 0) * quantity,
-                        "reliability": supplier.get('reliability_score', 0)
-                    })
+            # Find suitable suppliers, as (score, supplier) pairs
+            candidates = []
+            is_urgent = urgency == 'urgent'
+            for supplier in self._suppliers_for(catalog, requirement):
+                key = (id(supplier), is_urgent)
+                score = score_cache.get(key)
+                if score is None:
+                    score = score_cache[key] = self._calculate_procurement_score(supplier, requirement)
+                candidates.append((score, supplier))
             
-            # Sort by score and urgency
-            suitable_suppliers.sort(key=lambda x: x['score'], reverse=True)
+            # Only the top 3 by score are reported, so skip sorting the rest
+            # and build result dicts for those alone
+            top_suppliers = [
+                {
+                    "supplier_id": supplier.get('id'),
+                    "supplier_name": supplier.get('name'),
+                    "score": score,
+                    "delivery_time": supplier.get('delivery_time', 0),
+                    "cost": supplier.get('unit_cost', 0) * quantity,
+                    "reliability": supplier.get('reliability_score', 0)
+                }
+                for score, supplier in heapq.nlargest(3, candidates, key=_by_score)
+            ]
             
             procurement_recommendations.append({
                 "item_name": item_name,
                 "quantity": quantity,
                 "urgency": urgency,
-                "recommended_suppliers": suitable_suppliers[:3],  # Top 3 options
-                "recommendation": self._generate_procurement_recommendation(suitable_suppliers, urgency)
+                "recommended_suppliers": top_suppliers,  # Top 3 options
+                "recommendation": self._generate_procurement_recommendation(top_suppliers, urgency)
             })
         
         return {"procurement_recommendations": procurement_recommendations}
@@ -152,24 +224,24 @@ class SupplierAgent:
     def calculate_total_cost_of_ownership(self, supplier_data: List[Dict], item_requirements: List[Dict]) -> Dict[str, Any]:
         """Calculate total cost of ownership for different supplier options."""
         tco_analysis = {}
+        catalog = self._index_supplier_products(supplier_data)
         
         for requirement in item_requirements:
             item_name = requirement.get('item_name')
             quantity = requirement.get('quantity', 1)
             
             supplier_tcos = []
-            for supplier in supplier_data:
-                if self._supplier_can_fulfill(supplier, requirement):
-                    tco = self._calculate_tco(supplier, requirement)
-                    supplier_tcos.append({
-                        "supplier_id": supplier.get('id'),
-                        "supplier_name": supplier.get('name'),
-                        "tco": tco,
-                        "breakdown": self._get_tco_breakdown(supplier, requirement)
-                    })
+            for supplier in self._suppliers_for(catalog, requirement):
+                breakdown = self._get_tco_breakdown(supplier, quantity)
+                supplier_tcos.append({
+                    "supplier_id": supplier.get('id'),
+                    "supplier_name": supplier.get('name'),
+                    "tco": breakdown["total"],
+                    "breakdown": breakdown
+                })
             
             # Sort by TCO
-            supplier_tcos.sort(key=lambda x: x['tco'])
+            supplier_tcos.sort(key=_by_tco)
             
             tco_analysis[item_name] = {
                 "quantity": quantity,
@@ -180,101 +252,77 @@ class SupplierAgent:
         
         return {"tco_analysis": tco_analysis}
     
-    def _calculate_delivery_score(self, supplier: Dict) -> float:
+    def _calculate_delivery_score(self, delivery_time: float, on_time_delivery: float) -> float:
         """Calculate delivery performance score."""
-        delivery_time = supplier.get('delivery_time', 0)
-        on_time_delivery = supplier.get('on_time_delivery_rate', 100)
-        
         # Score based on delivery time and reliability
         time_score = max(0, 100 - delivery_time)  # Shorter delivery = higher score
         reliability_score = on_time_delivery
         
         return (time_score * 0.6 + reliability_score * 0.4) / 100
     
-    def _calculate_quality_score(self, supplier: Dict) -> float:
+    def _calculate_quality_score(self, cert_mask: int) -> float:
         """Calculate quality performance score."""
-        certifications = supplier.get('certifications', '')
-        quality_score = 50  # Base score
-        
-        # Add points for certifications
-        if 'ISO 9001' in certifications:
-            quality_score += 20
-        if 'FDA Certified' in certifications:
-            quality_score += 15
-        if 'ISO 14001' in certifications:
-            quality_score += 10
-        
-        return min(100, quality_score) / 100
+        # Base score of 50 plus points per certification (max 95)
+        quality_score = (
+            50
+            + 20 * (cert_mask & CERT_ISO_9001)
+            + 15 * ((cert_mask & CERT_FDA) >> 1)
+            + 10 * ((cert_mask & CERT_ISO_14001) >> 2)
+        )
+        return quality_score / 100
     
-    def _calculate_cost_score(self, supplier: Dict) -> float:
+    def _calculate_cost_score(self, unit_cost: float) -> float:
         """Calculate cost competitiveness score."""
-        unit_cost = supplier.get('unit_cost', 0)
         if unit_cost == 0:
             return 0.5  # Neutral score if no cost data
         
         # This would typically compare against market average
         # For now, use a simple scoring system
-        if unit_cost < 10:
-            return 1.0
-        elif unit_cost < 25:
-            return 0.8
-        elif unit_cost < 50:
-            return 0.6
-        else:
-            return 0.4
+        return COST_SCORES[bisect.bisect_right(COST_SCORE_THRESHOLDS, unit_cost)]
     
     def _categorize_performance(self, score: float) -> str:
         """Categorize supplier performance."""
-        if score >= 0.9:
-            return "excellent"
-        elif score >= 0.8:
-            return "good"
-        elif score >= 0.6:
-            return "average"
-        else:
-            return "poor"
+        return PERFORMANCE_TIER_LABELS[bisect.bisect_right(PERFORMANCE_TIER_THRESHOLDS, score)]
     
-    def _generate_supplier_recommendations(self, supplier: Dict, score: float) -> List[str]:
+    def _generate_supplier_recommendations(self, score: float, reliability: float,
+                                           cert_mask: int, delivery_time: float) -> List[str]:
         """Generate recommendations for supplier improvement."""
         recommendations = []
         
         if score < 0.6:
             recommendations.append("Consider finding alternative suppliers")
         
-        if supplier.get('reliability_score', 0) < 70:
+        if reliability < 70:
             recommendations.append("Improve delivery reliability")
         
-        if 'ISO 9001' not in supplier.get('certifications', ''):
+        if not cert_mask & CERT_ISO_9001:
             recommendations.append("Obtain ISO 9001 certification")
         
-        if supplier.get('delivery_time', 0) > 14:
+        if delivery_time > 14:
             recommendations.append("Reduce delivery lead times")
         
         return recommendations
     
     def _generate_mitigation_strategies(self, risks: List[Dict]) -> List[str]:
         """Generate risk mitigation strategies."""
-        strategies = []
-        
-        for risk in risks:
-            if risk['type'] == 'geographic':
-                strategies.append("Diversify supplier base across multiple regions")
-            elif risk['type'] == 'single_source':
-                strategies.append("Identify and qualify backup suppliers")
-            elif risk['type'] == 'financial':
-                strategies.append("Monitor supplier financial health regularly")
-            elif risk['type'] == 'compliance':
-                strategies.append("Require specific certifications in contracts")
-        
-        return strategies
+        return list(_mitigation_strategies(tuple(risk['type'] for risk in risks)))
     
-    def _supplier_can_fulfill(self, supplier: Dict, requirement: Dict) -> bool:
-        """Check if supplier can fulfill the requirement."""
+    def _index_supplier_products(self, supplier_data: List[Dict]) -> List[tuple]:
+        """Lowercase each supplier's product list once: (products, carries_general, supplier)."""
+        catalog = []
+        for supplier in supplier_data:
+            products = supplier.get('products', '').lower()
+            catalog.append((products, 'general' in products, supplier))
+        return catalog
+    
+    def _suppliers_for(self, catalog: List[tuple], requirement: Dict) -> List[Dict]:
+        """Suppliers that can fulfill the requirement."""
         # Simple check - in reality, this would be more complex
-        products = supplier.get('products', '').lower()
         item_name = requirement.get('item_name', '').lower()
-        
-        return item_name in products or 'general' in products
+        return [
+            supplier for products, carries_general, supplier in catalog
+            if carries_general or item_name in products
+        ]
     
     def _calculate_procurement_score(self, supplier: Dict, requirement: Dict) -> float:
         """Calculate procurement score for a supplier."""
@@ -310,29 +358,18 @@ class SupplierAgent:
         else:
             return f"Use {best_supplier['supplier_name']} for best overall performance"
     
-    def _calculate_tco(self, supplier: Dict, requirement: Dict) -> float:
-        """Calculate total cost of ownership."""
-        quantity = requirement.get('quantity', 1)
-        unit_cost = supplier.get('unit_cost', 0)
-        delivery_time = supplier.get('delivery_time', 0)
-        
+    def _get_tco_breakdown(self, supplier: Dict, quantity: int) -> Dict[str, float]:
+        """Calculate total cost of ownership with its breakdown (each term computed once)."""
         # Basic TCO calculation
-        product_cost = unit_cost * quantity
+        product_cost = supplier.get('unit_cost', 0) * quantity
         shipping_cost = supplier.get('shipping_cost', 0)
-        holding_cost = product_cost * 0.1 * (delivery_time / 365)  # 10% annual holding cost
-        
-        return product_cost + shipping_cost + holding_cost
-    
-    def _get_tco_breakdown(self, supplier: Dict, requirement: Dict) -> Dict[str, float]:
-        """Get detailed TCO breakdown."""
-        quantity = requirement.get('quantity', 1)
-        unit_cost = supplier.get('unit_cost', 0)
+        holding_cost = product_cost * 0.1 * (supplier.get('delivery_time', 0) / 365)  # 10% annual holding cost
         
         return {
-            "product_cost": unit_cost * quantity,
-            "shipping_cost": supplier.get('shipping_cost', 0),
-            "holding_cost": unit_cost * quantity * 0.1 * (supplier.get('delivery_time', 0) / 365),
-            "total": self._calculate_tco(supplier, requirement)
+            "product_cost": product_cost,
+            "shipping_cost": shipping_cost,
+            "holding_cost": holding_cost,
+            "total": product_cost + shipping_cost + holding_cost
         }
     
     def _calculate_potential_savings(self, supplier_options: List[Dict]) -> Dict[str, float]:
@@ -357,7 +394,7 @@ class SupplierAgent:
             "request_type": "supplier_recommendations",
             "target_agent": "inventory_agent",
             "data": supplier_recommendations,
-            "request_id": f"supplier_{datetime.now().isoformat()}"
+            "request_id": next_request_id(self.agent_id)
         }
     
     def collaborate_with_logistics_agent(self, procurement_data: Dict) -> Dict[str, Any]:
@@ -366,5 +403,5 @@ class SupplierAgent:
             "request_type": "shipping_optimization",
             "target_agent": "logistics_agent",
             "data": procurement_data,
-            "request_id": f"supplier_{datetime.now().isoformat()}"
+            "request_id": next_request_id(self.agent_id)
         }
@@ -88,18 +88,16 @@ class SupplyChainOptimizer:
         """Analyze current inventory levels and identify optimization opportunities"""
         inventory_items = [item for item in canvas_state.get("items", []) if item.get("type") == "inventory"]
         
-        analysis = {
-            "total_items": len(inventory_items),
-            "low_stock_items": [],
-            "overstock_items": [],
-            "out_of_stock_items": [],
-            "reorder_recommendations": [],
-            "cost_analysis": {},
-            "risk_assessment": {}
-        }
+        # Single pass: bucket lists are filled through bound appends and the
+        # analysis dict is assembled once at the end
+        low_stock_items = []
+        overstock_items = []
+        out_of_stock_items = []
+        add_low_stock = low_stock_items.append
+        add_overstock = overstock_items.append
+        add_out_of_stock = out_of_stock_items.append
         
         total_inventory_value = 0
-        critical_items = 0
         
         for item in inventory_items:
             data = item.get("data", {})
@@ -107,25 +105,22 @@ class SupplyChainOptimizer:
             min_stock = data.get("field4", 0)
             max_stock = data.get("field5", 0)
             unit_cost = data.get("field8", 0)
-            status = data.get("field12", "in stock")
             
-            item_value = current_stock * unit_cost
-            total_inventory_value += item_value
+            total_inventory_value += current_stock * unit_cost
             
             # Identify low stock items
             if current_stock <= min_stock:
-                analysis["low_stock_items"].append({
+                add_low_stock({
                     "item": item.get("name", ""),
                     "sku": data.get("field2", ""),
                     "current_stock": current_stock,
                     "min_stock": min_stock,
-                    "status": status
+                    "status": data.get("field12", "in stock")
                 })
-                critical_items += 1
             
             # Identify overstock items
             if current_stock > max_stock * 1.2:  # 20% over max
-                analysis["overstock_items"].append({
+                add_overstock({
                     "item": item.get("name", ""),
                     "sku": data.get("field2", ""),
                     "current_stock": current_stock,
@@ -135,22 +130,33 @@ class SupplyChainOptimizer:
             
             # Identify out of stock items
             if current_stock == 0:
-                analysis["out_of_stock_items"].append({
+                add_out_of_stock({
                     "item": item.get("name", ""),
                     "sku": data.get("field2", ""),
                     "supplier": data.get("field9", ""),
                     "lead_time": data.get("field11", 0)
                 })
         
-        analysis["cost_analysis"] = {
-            "total_inventory_value": total_inventory_value,
-            "average_item_value": total_inventory_value / len(inventory_items) if inventory_items else 0,
-            "critical_items_count": critical_items
+        item_count = len(inventory_items)
+        critical_items = len(low_stock_items)
+        
+        analysis = {
+            "total_items": item_count,
+            "low_stock_items": low_stock_items,
+            "overstock_items": overstock_items,
+            "out_of_stock_items": out_of_stock_items,
+            "reorder_recommendations": [],
+            "cost_analysis": {
+                "total_inventory_value": total_inventory_value,
+                "average_item_value": total_inventory_value / item_count if item_count else 0,
+                "critical_items_count": critical_items
+            },
+            "risk_assessment": {}
         }
         
         analysis["risk_assessment"] = {
-            "supply_risk": "high" if critical_items > len(inventory_items) * 0.2 else "medium",
-            "inventory_turnover": self._calculate_inventory_turnover(inventory_items),
+            "supply_risk": "high" if critical_items > item_count * 0.2 else "medium",
+            "inventory_turnover": self._calculate_inventory_turnover(total_inventory_value, item_count),
             "recommendations": self._generate_inventory_recommendations(analysis)
         }
         
@@ -506,13 +512,12 @@ class SupplyChainOptimizer:
         return tco_analysis
     
     # Helper methods
-    def _calculate_inventory_turnover(self, inventory_items: List[Dict]) -> float:
-        """Calculate inventory turnover ratio"""
-        if not inventory_items:
+    def _calculate_inventory_turnover(self, total_inventory_value: float, item_count: int) -> float:
+        """Calculate inventory turnover ratio from the already-summed inventory value"""
+        if not item_count:
             return 0
         
-        total_cost = sum(item.get("data", {}).get("field8", 0) * item.get("data", {}).get("field3", 0) for item in inventory_items)
-        average_inventory = total_cost / len(inventory_items) if inventory_items else 0
+        average_inventory = total_inventory_value / item_count
         
         # Simplified calculation - in real implementation, use actual sales data
         return 12.0 if average_inventory > 0 else 0